@@ -2,19 +2,60 @@
 """Configuration settings for the Facebook Ads scraper"""
 
 import os
+import soupsieve as sv
 
 class Config:
     # File paths
     DEFAULT_KEYWORDS_FILE = "main_input.txt"
     OUTPUT_DIR = "scraped_data"
     
+    # File I/O buffer sizes (bytes)
+    READ_BUFFER_SIZE = 1 << 16
+    WRITE_BUFFER_SIZE = 1 << 20
+    
+    # Smaller JSON payloads are written inline; handing them to a writer thread costs more
+    ASYNC_WRITE_MIN_BYTES = 1 << 20
+    
+    # Raw HTML dumps are gzipped; level 1 is fast and still shrinks them ~10x
+    SAVE_RAW_HTML = True
+    HTML_COMPRESSION_LEVEL = 1
+    
     # Scraping settings
     MAX_STALLS = 3
+    MAX_SCROLL_ATTEMPTS = 100
     SCROLL_WAIT_TIME = 2
     LOAD_WAIT_TIME = 5
     
+    # Extra wait after a stalled scroll, growing each consecutive stall
+    STALL_BACKOFF_START = 2.0
+    STALL_BACKOFF_FACTOR = 1.5
+    STALL_BACKOFF_MAX = 30.0
+    
+    # Parallel keyword scraping (each session runs its own Chrome, ~400 MB)
+    MAX_PARALLEL_SESSIONS = 3
+    SESSION_MEMORY_MB = 400
+    
+    # Pages with at least this many ads are extracted in a process pool, in chunks
+    # (single-session runs only; parallel sessions already use the other cores)
+    PARALLEL_PARSE_MIN_ADS = 64
+    AD_PARSE_CHUNK_SIZE = 50
+    
+    # Fast launch profile: new headless mode without images/autoplay/GPU. Off by
+    # default because captchas and unlimited scrolling behave better when headed.
+    FAST_MODE = False
+    FAST_MODE_CHROMIUM_ARGS = (
+        "--autoplay-policy=user-gesture-required",
+        "--disable-gpu",
+    )
+    
+    # Chrome profile kept between runs so cache, cookies and solved captchas carry
+    # over; each parallel session gets its own copy (suffixed with its index)
+    CHROME_PROFILE_DIR = "chrome_profile"
+    FRESH_PROFILE = False
+    
     # Selectors
-    AD_WRAPPER_SELECTOR = ".xrvj5dj > div"
+    AD_CONTAINER_CLASS = "xrvj5dj"
+    AD_WRAPPER_SELECTOR = f".{AD_CONTAINER_CLASS} > div"
     LIBRARY_ID_SELECTOR = ".x1rg5ohu span.xw23nyj"
     START_DATE_SELECTOR = "div.x3nfvp2:nth-of-type(3) span"
     CATEGORY_SELECTOR = ".xb2kyzz div._4ik4"
@@ -23,9 +64,28 @@ class Config:
     PAGE_IMAGE_LINK_SELECTOR = "a"
     AD_DESCRIPTION_SELECTOR = ".x8t9es0 div ._4ik4 span"
     MEDIA_CONTAINER_SELECTOR = "div._7jyg"
+    PROGRESS_BAR_SELECTOR = "div[role='progressbar']"
+    LOAD_MORE_SELECTORS = (
+        "[data-testid='more-items-button']",
+        "button:contains('See more')",
+        "button:contains('Load more')",
+        "[aria-label*='more']",
+    )
     
     # Media file extensions
-    IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.bmp', '.ico', '.tiff'}
-    VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.wmv', '.flv', '.webm', '.mkv', '.m4v'}
-    AUDIO_EXTENSIONS = {'.mp3', '.wav', '.ogg', '.m4a', '.aac', '.flac', '.wma'}
+    IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.bmp', '.ico', '.tiff'})
+    VIDEO_EXTENSIONS = frozenset({'.mp4', '.avi', '.mov', '.wmv', '.flv', '.webm', '.mkv', '.m4v'})
+    AUDIO_EXTENSIONS = frozenset({'.mp3', '.wav', '.ogg', '.m4a', '.aac', '.flac', '.wma'})
+
 
+class CompiledSelectors:
+    """CSS selectors from Config, compiled once and reused for every ad wrapper"""
+    AD_WRAPPER = sv.compile(Config.AD_WRAPPER_SELECTOR)
+    LIBRARY_ID = sv.compile(Config.LIBRARY_ID_SELECTOR)
+    START_DATE = sv.compile(Config.START_DATE_SELECTOR)
+    CATEGORY = sv.compile(Config.CATEGORY_SELECTOR)
+    CTA = sv.compile(Config.CTA_SELECTOR)
+    PAGE_NAME = sv.compile(Config.PAGE_NAME_SELECTOR)
+    PAGE_IMAGE_LINK = sv.compile(Config.PAGE_IMAGE_LINK_SELECTOR)
+    AD_DESCRIPTION = sv.compile(Config.AD_DESCRIPTION_SELECTOR)
+    MEDIA_CONTAINER = sv.compile(Config.MEDIA_CONTAINER_SELECTOR)
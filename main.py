@@ -1,87 +1,270 @@
 # main.py
 """Main entry point for the Facebook Ads scraper"""
 
-from seleniumbase import SB
-from scrapers.browser_controller import BrowserController
-from scrapers.ad_scraper import FacebookAdScraper
-from utils.file_utils import get_user_input_for_keyword, save_scraped_data
+import os
+import queue
+import argparse
+import shutil
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from urllib.parse import quote_plus
+from config import Config
+from utils.file_utils import (
+    ensure_output_dir, get_scraped_keywords, get_user_input_for_keyword,
+    load_keywords_from_file, sanitize_keyword, save_scraped_data,
+)
 
 class FacebookAdsScraper:
-    def __init__(self):
+    URL_TEMPLATE = (
+        "https://www.facebook.com/ads/library/"
+        "?active_status=active"
+        "&ad_type=all"
+        "&country=EG"
+        "&is_targeted_country=false"
+        "&media_type=all"
+        "&publisher_platforms[0]=facebook"
+        "&publisher_platforms[1]=instagram"
+        "&q={q}"
+        "&search_type=keyword_unordered"
+    )
+    
+    def __init__(self, fast=Config.FAST_MODE, profile_id=0, fresh_profile=Config.FRESH_PROFILE,
+                 headless=False, max_parallel=Config.MAX_PARALLEL_SESSIONS,
+                 max_scroll_attempts=Config.MAX_SCROLL_ATTEMPTS, save_html=Config.SAVE_RAW_HTML):
+        from scrapers.ad_scraper import FacebookAdScraper
+        
+        self.fast = fast
+        self.profile_id = profile_id
+        self.fresh_profile = fresh_profile
+        self.headless = headless
+        self.max_parallel = max_parallel
+        self.max_scroll_attempts = max_scroll_attempts
+        self.save_html = save_html
         self.browser_controller = None
         self.ad_scraper = FacebookAdScraper()
+        self.writer = None
     
     def build_facebook_url(self, keyword):
         """Build Facebook Ads Library URL"""
-        base_url = "https://www.facebook.com/ads/library/"
-        params = [
-            "active_status=active",
-            "ad_type=all", 
-            "country=EG",
-            "is_targeted_country=false",
-            "media_type=all",
-            "publisher_platforms[0]=facebook",
-            "publisher_platforms[1]=instagram",
-            f"q={keyword}",
-            "search_type=keyword_unordered"
-        ]
-        return f"{base_url}?{'&'.join(params)}"
-    
-    def scrape_keyword(self, keyword):
-        """Scrape ads for a single keyword"""
+        return self.URL_TEMPLATE.format(q=quote_plus(keyword))
+    
+    def scrape_keyword_in_session(self, sb, keyword):
+        """Scroll a keyword's results in an open session and queue their extraction and save;
+        returns the queued job's future, or None if the page could not be scraped"""
         try:
             print(f"\n🔍 Starting scrape for keyword: '{keyword}'")
             
-            with SB(test=True, uc=True) as sb:
-                # Initialize browser controller
+            # Navigate to Facebook Ads Library
+            url = self.build_facebook_url(keyword)
+            sb.open(url)
+            
+            # Scroll and get HTML content
+            final_html = self.browser_controller.scroll_to_bottom_and_get_html()
+            
+            # Extract and save the results in the background while the next keyword scrolls
+            future = self.writer.submit(self.extract_and_save, final_html, keyword)
+            
+            print(f"📥 Captured results for '{keyword}', extracting in the background")
+            return future
+            
+        except Exception as e:
+            print(f"❌ Error scraping keyword '{keyword}': {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+    
+    def extract_and_save(self, html_content, keyword):
+        """Scrape the ads out of a page's HTML and save them (runs on the writer thread)"""
+        scraped_data = self.ad_scraper.scrape_facebook_ads(html_content, keyword)
+        saved = save_scraped_data(html_content, scraped_data, keyword, self.save_html)
+        
+        if saved:
+            print(f"✅ Successfully completed scraping for '{keyword}'")
+        return saved
+    
+    def reset_session_state(self, sb):
+        """Stop pending loads and clear page storage before the next keyword"""
+        try:
+            sb.execute_script("window.stop(); localStorage.clear(); sessionStorage.clear();")
+        except Exception as e:
+            print(f"Error resetting browser state: {e}")
+    
+    def get_profile_dir(self):
+        """Get the persistent Chrome profile directory for this session"""
+        return os.path.abspath(f"{Config.CHROME_PROFILE_DIR}_{self.profile_id}")
+    
+    def get_browser_options(self):
+        """Build the SB() launch options for this scraper"""
+        options = {'test': True, 'uc': True, 'user_data_dir': self.get_profile_dir()}
+        
+        if self.headless:
+            options['headless2'] = True
+        
+        if self.fast:
+            options.update(
+                headless2=True,
+                block_images=True,
+                chromium_arg=",".join(Config.FAST_MODE_CHROMIUM_ARGS),
+            )
+        
+        return options
+    
+    def get_worker_options(self):
+        """Get the settings a worker process needs to build an equivalent scraper"""
+        return {
+            'fast': self.fast,
+            'fresh_profile': self.fresh_profile,
+            'headless': self.headless,
+            'max_scroll_attempts': self.max_scroll_attempts,
+            'save_html': self.save_html,
+        }
+    
+    def scrape_keywords_in_session(self, keywords, total=None):
+        """Scrape keywords (any iterable, e.g. a shared queue) in a single browser session"""
+        # Heavy browser imports are deferred until a session is actually needed
+        from seleniumbase import SB
+        from scrapers.browser_controller import BrowserController
+        
+        results = {}
+        pending_saves = {}
+        ensure_output_dir()
+        
+        if self.fresh_profile:
+            shutil.rmtree(self.get_profile_dir(), ignore_errors=True)
+        
+        self.writer = ThreadPoolExecutor(max_workers=1)
+        
+        try:
+            with SB(**self.get_browser_options()) as sb:
+                # Initialize browser controller once for the whole session
                 self.browser_controller = BrowserController(sb)
+                self.browser_controller.config.MAX_SCROLL_ATTEMPTS = self.max_scroll_attempts
                 
-                # Navigate to Facebook Ads Library
-                url = self.build_facebook_url(keyword)
-                sb.open(url)
-                
-                # Scroll and get HTML content
-                final_html = self.browser_controller.scroll_to_bottom_and_get_html()
-                
-                # Scrape the data
-                scraped_data = self.ad_scraper.scrape_facebook_ads(final_html, keyword)
-                
-                # Save the results
-                save_scraped_data(final_html, scraped_data, keyword)
-                
-                print(f"✅ Successfully completed scraping for '{keyword}'")
-                return True
-                
+                for i, keyword in enumerate(keywords, 1):
+                    if total != 1:
+                        progress = f"{i}/{total}" if total else f"#{i}"
+                        print(f"\n{'='*50}")
+                        print(f"Processing keyword {progress}: '{keyword}'")
+                        print(f"{'='*50}")
+                    
+                    if i > 1:
+                        self.reset_session_state(sb)
+                    
+                    future = self.scrape_keyword_in_session(sb, keyword)
+                    results[keyword] = False
+                    if future is not None:
+                        pending_saves[keyword] = future
+                    
+                    # Ctrl+C ends the current page's scroll (its results are still saved)
+                    # and the session: no further keywords are taken, even from a shared queue
+                    if self.browser_controller.stop_event.is_set():
+                        print("⏹️  Stopped by user, not starting any more keywords")
+                        break
+                    
         except Exception as e:
-            print(f"❌ Error scraping keyword '{keyword}': {e}")
+            print(f"❌ Browser session error: {e}")
             import traceback
             traceback.print_exc()
-            return False
+        finally:
+            # Make sure every queued output file is on disk before reporting
+            self.writer.shutdown(wait=True)
+        
+        # A keyword only counts as scraped once its extraction and save have succeeded
+        for keyword, future in pending_saves.items():
+            try:
+                results[keyword] = future.result()
+            except Exception as e:
+                print(f"❌ Error extracting/saving results for '{keyword}': {e}")
+                results[keyword] = False
+        
+        return results
+    
+    def scrape_keyword(self, keyword, force=False):
+        """Scrape ads for a single keyword (unless, when not forced, it already has output)"""
+        if not self.filter_keywords([keyword], force):
+            print("✅ Nothing left to scrape")
+            return True
+        
+        return self.scrape_keywords_in_session([keyword], total=1).get(keyword, False)
+    
+    def get_max_parallel_sessions(self, keyword_count):
+        """Cap parallel browser sessions by config, keyword count and free memory"""
+        workers = min(self.max_parallel, keyword_count)
+        
+        available_mb = get_available_memory_mb()
+        if available_mb is not None:
+            workers = min(workers, available_mb // Config.SESSION_MEMORY_MB)
+        
+        return max(1, workers)
+    
+    def filter_keywords(self, keywords, force=False):
+        """Drop duplicate keywords and, unless forced, keywords that already have output"""
+        unique_keywords = list(dict.fromkeys(keywords))
+        if len(unique_keywords) < len(keywords):
+            print(f"⏭️  Skipping {len(keywords) - len(unique_keywords)} duplicate keywords")
+        
+        if force:
+            return unique_keywords
+        
+        scraped_keywords = get_scraped_keywords()
+        pending_keywords = [k for k in unique_keywords if sanitize_keyword(k) not in scraped_keywords]
+        if len(pending_keywords) < len(unique_keywords):
+            print(f"⏭️  Skipping {len(unique_keywords) - len(pending_keywords)} already scraped keywords")
+        
+        return pending_keywords
     
-    def scrape_multiple_keywords(self, keywords):
+    def scrape_multiple_keywords(self, keywords, force=False):
         """Scrape ads for multiple keywords"""
-        successful = 0
-        failed = 0
+        keywords = self.filter_keywords(keywords, force)
+        if not keywords:
+            print("✅ Nothing left to scrape")
+            return
+        
+        max_workers = self.get_max_parallel_sessions(len(keywords))
+        
+        results = dict.fromkeys(keywords, False)
         
-        for i, keyword in enumerate(keywords, 1):
-            print(f"\n{'='*50}")
-            print(f"Processing keyword {i}/{len(keywords)}: '{keyword}'")
-            print(f"{'='*50}")
+        if max_workers == 1:
+            results.update(self.scrape_keywords_in_session(keywords, total=len(keywords)))
+        else:
+            print(f"\n🚀 Scraping {len(keywords)} keywords with {max_workers} parallel sessions")
             
-            if self.scrape_keyword(keyword):
-                successful += 1
-            else:
-                failed += 1
+            # Chrome (uc mode) is not fork-safe, so workers are spawned fresh
+            mp_context = multiprocessing.get_context('spawn')
+            with mp_context.Manager() as manager, \
+                    ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as executor:
+                # Workers pull from a shared queue, so a slow keyword never holds up a
+                # pre-assigned batch; each worker keeps one browser session open
+                keyword_queue = manager.Queue()
+                for keyword in keywords:
+                    keyword_queue.put(keyword)
+                
+                # Each worker gets its own profile, as Chrome locks a profile while in use
+                futures = [
+                    executor.submit(
+                        scrape_keywords_worker, keyword_queue, worker_id, self.get_worker_options()
+                    )
+                    for worker_id in range(max_workers)
+                ]
+                
+                for future in as_completed(futures):
+                    try:
+                        results.update(future.result())
+                    except Exception as e:
+                        print(f"❌ Worker failed: {e}")
+        
+        successful = sum(1 for success in results.values() if success)
+        failed = len(results) - successful
         
         print(f"\n{'='*50}")
         print(f"📊 SCRAPING SUMMARY")  
         print(f"{'='*50}")
         print(f"✅ Successful: {successful}")
         print(f"❌ Failed: {failed}")
-        print(f"📝 Total: {len(keywords)}")
+        print(f"📝 Total: {len(results)}")
         print(f"{'='*50}")
     
-    def run_interactive(self):
+    def run_interactive(self, force=False):
         """Run the scraper in interactive mode"""
         print("🚀 Facebook Ads Scraper - Interactive Mode")
         print("=" * 50)
@@ -95,15 +278,98 @@ class FacebookAdsScraper:
         print(f"📝 Keywords to scrape: {keywords}")
         
         if len(keywords) == 1:
-            self.scrape_keyword(keywords[0])
+            self.scrape_keyword(keywords[0], force)
         else:
-            self.scrape_multiple_keywords(keywords)
+            self.scrape_multiple_keywords(keywords, force)
     
-    def run_with_keyword(self, keyword):
+    def run_with_keyword(self, keyword, force=False):
         """Run the scraper with a specific keyword"""
         print(f"🚀 Facebook Ads Scraper - Single Keyword Mode")
         print("=" * 50)
-        self.scrape_keyword(keyword)
+        self.scrape_keyword(keyword, force)
+
+
+def iter_queue(work_queue):
+    """Yield items from a queue until it is empty"""
+    while True:
+        try:
+            yield work_queue.get_nowait()
+        except queue.Empty:
+            return
+
+
+def get_available_memory_mb():
+    """Get the memory available for new processes in MB, or None if unknown"""
+    # MemAvailable counts reclaimable page cache, which free pages (MemFree) leave out
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') // (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def scrape_keywords_worker(keyword_queue, worker_id=0, options=None):
+    """Scrape keywords pulled from a shared queue in a worker process"""
+    scraper = FacebookAdsScraper(profile_id=worker_id, **(options or {}))
+    return scraper.scrape_keywords_in_session(iter_queue(keyword_queue))
+
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Scrape ads from the Facebook Ads Library")
+    parser.add_argument("--keyword", action="append",
+                        help="keyword to scrape (repeat for several)")
+    parser.add_argument("--keywords-file",
+                        help=f"file with one keyword per line (e.g. {Config.DEFAULT_KEYWORDS_FILE})")
+    parser.add_argument("--parallel", type=int, default=Config.MAX_PARALLEL_SESSIONS,
+                        help="maximum parallel browser sessions")
+    parser.add_argument("--max-pages", type=int, default=Config.MAX_SCROLL_ATTEMPTS,
+                        help="maximum scroll attempts per keyword")
+    parser.add_argument("--headless", action="store_true",
+                        help="run Chrome headless")
+    parser.add_argument("--fast", action="store_true", default=Config.FAST_MODE,
+                        help="headless, no images, no autoplay")
+    parser.add_argument("--force", action="store_true",
+                        help="scrape keywords that already have output")
+    parser.add_argument("--no-html", dest="save_html", action="store_false", default=Config.SAVE_RAW_HTML,
+                        help="skip saving the raw page HTML")
+    parser.add_argument("--fresh-profile", action="store_true", default=Config.FRESH_PROFILE,
+                        help="delete the saved Chrome profile before starting")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Command line entry point; prompts for keywords when none are given"""
+    args = parse_args(argv)
+    scraper = FacebookAdsScraper(
+        fast=args.fast,
+        fresh_profile=args.fresh_profile,
+        headless=args.headless,
+        max_parallel=max(1, args.parallel),
+        max_scroll_attempts=args.max_pages,
+        save_html=args.save_html,
+    )
+    
+    if not args.keyword and not args.keywords_file:
+        scraper.run_interactive(force=args.force)
+        return
+    
+    keywords = list(args.keyword or [])
+    if args.keywords_file:
+        keywords.extend(load_keywords_from_file(args.keywords_file))
+    
+    if not keywords:
+        print("❌ No keywords provided. Exiting...")
+        return
+    
+    scraper.scrape_multiple_keywords(keywords, force=args.force)
 
 
 def test_main():
@@ -112,4 +378,4 @@ def test_main():
     scraper.run_interactive()
 
 if __name__ == "__main__":
-    test_main()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -6,17 +6,27 @@ This file contains optimized versions of key components with performance enhance
 
 import asyncio
 import time
-import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import signal
+import multiprocessing
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 from collections import deque
-import json
 import os
 from datetime import datetime
-import weakref
 import gc
 
+# psutil is optional: without it memory is read from /proc on Linux, and elsewhere
+# memory checks always report "within limit"
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from config import Config
+from scrapers.browser_controller import BrowserController
+from utils.file_utils import dump_json_bytes
+
 # ============================================================================
 # 1. ASYNC/CONCURRENT PROCESSING IMPROVEMENTS
 # ============================================================================
@@ -24,44 +34,80 @@ import gc
 class AsyncDataProcessor:
     """Async data processing for I/O operations"""
     
-    def __init__(self, max_workers: int = 3):
-        self.max_workers = max_workers
-        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+    def __init__(self):
+        # One background writer: saves queue up behind it and never wait on each other
+        self.writer = ThreadPoolExecutor(max_workers=1)
+        self.pending = []
     
     async def save_data_async(self, data: Dict[str, Any], filepath: str) -> bool:
-        """Async file writing"""
-        loop = asyncio.get_event_loop()
+        """Write small JSON files directly and queue large ones; await drain() to finish"""
+        result = self._start_json_write(data, filepath)
+        if isinstance(result, Future):
+            self.pending.append(result)
+            return True
+        return result
+    
+    def _start_json_write(self, data: Dict[str, Any], filepath: str):
+        """Write a small JSON file inline (returning success) or queue a large one (returning its Future)"""
         try:
-            await loop.run_in_executor(
-                self.executor, 
-                self._write_json_file, 
-                data, 
-                filepath
-            )
+            # Compact, as these files are read by code
+            payload = dump_json_bytes(data, indent=False)
+        except Exception as e:
+            print(f"Error serializing {filepath}: {e}")
+            return False
+        
+        if len(payload) < Config.ASYNC_WRITE_MIN_BYTES:
+            return self._write_json_file(payload, filepath)
+        
+        return self.writer.submit(self._write_json_file, payload, filepath)
+    
+    async def drain(self) -> List[bool]:
+        """Wait for every queued write, returning whether each one succeeded"""
+        pending, self.pending = self.pending, []
+        return await asyncio.gather(*map(asyncio.wrap_future, pending))
+    
+    def _write_json_file(self, payload: bytes, filepath: str) -> bool:
+        """Blocking write of serialized JSON"""
+        # Write beside the target and rename over it, so a killed write never
+        # leaves a truncated file behind
+        temp_path = filepath + '.tmp'
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(payload)
+            os.replace(temp_path, filepath)
             return True
         except Exception as e:
             print(f"Error saving {filepath}: {e}")
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
             return False
     
-    def _write_json_file(self, data: Dict[str, Any], filepath: str):
-        """Blocking JSON write operation"""
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    
     async def process_multiple_files(self, data_list: List[Dict], base_path: str):
-        """Process multiple files concurrently"""
-        tasks = []
-        for i, data in enumerate(data_list):
-            filepath = f"{base_path}_{i}.json"
-            task = self.save_data_async(data, filepath)
-            tasks.append(task)
-        
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        """Save numbered JSON files (small ones inline, blocking the event loop); returns each one's success in order"""
+        started = [
+            self._start_json_write(data, f"{base_path}_{i}.json")
+            for i, data in enumerate(data_list)
+        ]
+        results = [
+            await asyncio.wrap_future(result) if isinstance(result, Future) else result
+            for result in started
+        ]
         successful = sum(1 for r in results if r is True)
         print(f"Successfully saved {successful}/{len(data_list)} files")
         return results
 
 
+def scrape_keyword_in_process(keyword: str, scraper_options: Optional[Dict[str, Any]] = None,
+                              profile_id: int = 0) -> bool:
+    """Scrape one keyword with a scraper (and browser) created inside the worker process"""
+    from main import FacebookAdsScraper
+    
+    scraper = FacebookAdsScraper(profile_id=profile_id, **(scraper_options or {}))
+    return scraper.scrape_keyword(keyword)
+
+
 class ConcurrentKeywordProcessor:
     """Process multiple keywords concurrently with rate limiting"""
     
@@ -71,7 +117,8 @@ class ConcurrentKeywordProcessor:
         self.results = {}
         self.failed_keywords = []
     
-    def process_keywords_batch(self, keywords: List[str], scraper_instance) -> Dict[str, Any]:
+    def process_keywords_batch(self, keywords: List[str],
+                               scraper_options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Process keywords in batches to avoid overwhelming the server"""
         all_results = {}
         
@@ -79,49 +126,58 @@ class ConcurrentKeywordProcessor:
         batches = [keywords[i:i + self.max_concurrent] 
                   for i in range(0, len(keywords), self.max_concurrent)]
         
-        for batch_idx, batch in enumerate(batches):
-            print(f"\n🚀 Processing batch {batch_idx + 1}/{len(batches)}: {batch}")
-            
-            # Process current batch concurrently
-            batch_results = self._process_single_batch(batch, scraper_instance)
-            all_results.update(batch_results)
-            
-            # Delay between batches (except for the last one)
-            if batch_idx < len(batches) - 1:
-                print(f"⏳ Waiting {self.delay_between_batches}s before next batch...")
-                time.sleep(self.delay_between_batches)
+        # Scraping is CPU-heavy Python (parsing) plus a browser per keyword, so workers are
+        # processes rather than threads; one spawned pool is reused for every batch
+        mp_context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.max_concurrent, mp_context=mp_context) as executor:
+            for batch_idx, batch in enumerate(batches):
+                print(f"\n🚀 Processing batch {batch_idx + 1}/{len(batches)}: {batch}")
+                
+                # Process current batch concurrently
+                batch_results = self._process_single_batch(batch, executor, scraper_options)
+                all_results.update(batch_results)
+                
+                # Delay between batches (except for the last one)
+                if batch_idx < len(batches) - 1:
+                    print(f"⏳ Waiting {self.delay_between_batches}s before next batch...")
+                    time.sleep(self.delay_between_batches)
         
         return all_results
     
-    def _process_single_batch(self, keywords: List[str], scraper_instance) -> Dict[str, Any]:
+    def _process_single_batch(self, keywords: List[str], executor,
+                              scraper_options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Process a single batch of keywords concurrently"""
-        batch_results = {}
+        # Results keep the batch's keyword order whatever order they complete in
+        batch_results = dict.fromkeys(keywords)
+        
+        # Submit all tasks; each slot in the batch gets its own Chrome profile, as Chrome
+        # locks a profile while in use (batches run one after another, so slots are reused)
+        future_to_keyword = {
+            executor.submit(scrape_keyword_in_process, keyword, scraper_options, slot): keyword
+            for slot, keyword in enumerate(keywords)
+        }
         
-        with ThreadPoolExecutor(max_workers=self.max_concurrent) as executor:
-            # Submit all tasks
-            future_to_keyword = {
-                executor.submit(scraper_instance.scrape_keyword, keyword): keyword 
-                for keyword in keywords
-            }
-            
-            # Process completed tasks
-            for future in as_completed(future_to_keyword):
-                keyword = future_to_keyword[future]
-                try:
-                    result = future.result()
-                    batch_results[keyword] = {
-                        'success': result,
-                        'timestamp': datetime.now().isoformat()
-                    }
-                    print(f"✅ Completed: {keyword}")
-                except Exception as e:
-                    print(f"❌ Failed: {keyword} - {e}")
-                    batch_results[keyword] = {
-                        'success': False,
-                        'error': str(e),
-                        'timestamp': datetime.now().isoformat()
-                    }
-                    self.failed_keywords.append(keyword)
+        # One timestamp for the whole batch
+        timestamp = datetime.now().isoformat()
+        
+        # Process completed tasks
+        for future in as_completed(future_to_keyword):
+            keyword = future_to_keyword[future]
+            try:
+                result = future.result()
+                batch_results[keyword] = {
+                    'success': result,
+                    'timestamp': timestamp
+                }
+                print(f"✅ Completed: {keyword}")
+            except Exception as e:
+                print(f"❌ Failed: {keyword} - {e}")
+                batch_results[keyword] = {
+                    'success': False,
+                    'error': str(e),
+                    'timestamp': timestamp
+                }
+                self.failed_keywords.append(keyword)
         
         return batch_results
 
@@ -131,12 +187,18 @@ class BatchAdProcessor:
     
     def __init__(self, batch_size: int = 50):
         self.batch_size = batch_size
+        self.memory_monitor = MemoryMonitor()
     
     def process_ads_in_batches(self, ad_elements: List, scraper_instance, keyword: str) -> List[Dict]:
         """Process ads in batches to reduce memory usage"""
         all_ads = []
         total_batches = (len(ad_elements) + self.batch_size - 1) // self.batch_size
         
+        # One clock reading shared by every ad, as in FacebookAdScraper.scrape_facebook_ads
+        now = datetime.now()
+        now_timestamp = int(now.timestamp())
+        scraped_at = now.isoformat()
+        
         for batch_idx in range(0, len(ad_elements), self.batch_size):
             batch_num = (batch_idx // self.batch_size) + 1
             batch = ad_elements[batch_idx:batch_idx + self.batch_size]
@@ -146,20 +208,18 @@ class BatchAdProcessor:
             batch_results = []
             for ad_element in batch:
                 try:
-                    ad_data = scraper_instance.scrape_single_ad(ad_element, keyword)
+                    ad_data = scraper_instance.scrape_single_ad(ad_element, keyword, now_timestamp, scraped_at)
                     batch_results.append(ad_data)
                 except Exception as e:
                     print(f"Error processing ad: {e}")
                     continue
             
             all_ads.extend(batch_results)
-            
-            # Force garbage collection after each batch
             del batch_results
-            gc.collect()
             
-            # Small delay between batches
-            time.sleep(0.1)
+            # Only pay for a full garbage collection when memory is actually tight
+            if self.memory_monitor.check_memory_limit():
+                self.memory_monitor.force_cleanup()
         
         return all_ads
 
@@ -177,24 +237,24 @@ class StreamingJSONWriter:
         self.first_item = True
     
     def __enter__(self):
-        self.file_handle = open(self.filepath, 'w', encoding='utf-8')
-        self.file_handle.write('[\n')
+        # Items accumulate in a large buffer; closing the file flushes it
+        self.file_handle = open(self.filepath, 'wb', buffering=Config.WRITE_BUFFER_SIZE)
+        self.file_handle.write(b'[\n')
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
         if self.file_handle:
-            self.file_handle.write('\n]')
+            self.file_handle.write(b'\n]')
             self.file_handle.close()
     
     def write_item(self, item: Dict[str, Any]):
         """Write a single item to the JSON array"""
         if not self.first_item:
-            self.file_handle.write(',\n')
+            self.file_handle.write(b',\n')
         else:
             self.first_item = False
         
-        json.dump(item, self.file_handle, ensure_ascii=False, indent=2)
-        self.file_handle.flush()  # Ensure data is written immediately
+        self.file_handle.write(dump_json_bytes(item))
 
 
 class MemoryOptimizedHTMLProcessor:
@@ -230,23 +290,27 @@ class MemoryOptimizedHTMLProcessor:
     
     def _split_html_content(self, html_content: str) -> List[str]:
         """Split HTML content into logical chunks"""
-        # Simple implementation - split by ad wrapper divs
+        # Simple implementation - split by ad wrapper divs. Lines are collected in a
+        # list and joined once per chunk, keeping the split linear in the page size.
+        marker = f'class="{Config.AD_CONTAINER_CLASS}"'
         chunks = []
-        current_chunk = ""
+        current_lines = []
+        current_size = 0
         
-        lines = html_content.split('\n')
-        for line in lines:
-            current_chunk += line + '\n'
+        for line in html_content.split('\n'):
+            current_lines.append(line)
+            current_size += len(line) + 1
             
             # If chunk is getting large and we hit a natural break point
-            if (len(current_chunk) > self.chunk_size and 
-                'class="xrvj5dj"' in line):  # Ad wrapper class
-                chunks.append(current_chunk)
-                current_chunk = ""
+            if current_size > self.chunk_size and marker in line:
+                chunks.append('\n'.join(current_lines) + '\n')
+                current_lines = []
+                current_size = 0
         
         # Add remaining content
-        if current_chunk.strip():
-            chunks.append(current_chunk)
+        remaining = '\n'.join(current_lines) + '\n' if current_lines else ''
+        if remaining.strip():
+            chunks.append(remaining)
         
         return chunks
 
@@ -256,13 +320,22 @@ class MemoryMonitor:
     
     def __init__(self, max_memory_mb: int = 1024):
         self.max_memory_mb = max_memory_mb
-        self.weak_refs = weakref.WeakSet()
+        
+        # The process handle is reused for every check
+        self.process = psutil.Process(os.getpid()) if psutil is not None else None
     
     def get_memory_usage(self) -> float:
-        """Get current memory usage in MB"""
-        import psutil
-        process = psutil.Process(os.getpid())
-        return process.memory_info().rss / 1024 / 1024
+        """Get current memory usage in MB (0 when it cannot be measured)"""
+        if self.process is not None:
+            return self.process.memory_info().rss / 1024 / 1024
+        
+        # Resident pages are the second field of /proc/self/statm
+        try:
+            with open('/proc/self/statm') as f:
+                resident_pages = int(f.read().split()[1])
+            return resident_pages * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+        except (OSError, ValueError, IndexError, AttributeError):
+            return 0.0
     
     def check_memory_limit(self) -> bool:
         """Check if memory usage exceeds limit"""
@@ -276,9 +349,6 @@ class MemoryMonitor:
         """Force garbage collection and cleanup"""
         print("🧹 Performing memory cleanup...")
         
-        # Clear weak references
-        self.weak_refs.clear()
-        
         # Force garbage collection
         collected = gc.collect()
         print(f"Collected {collected} objects")
@@ -302,6 +372,18 @@ class ScrollMetrics:
     last_element_count: int = 0
 
 
+# Counts ads, scrolls to the bottom, waits waitMs in the browser and counts again,
+# resolving with [initial count, final count]
+ADAPTIVE_SCROLL_JS = """
+    const waitMs = arguments[0];
+    const selector = arguments[1];
+    const done = arguments[arguments.length - 1];
+    const initialCount = document.querySelectorAll(selector).length;
+    
+    window.scrollTo(0, document.body.scrollHeight);
+    setTimeout(() => done([initialCount, document.querySelectorAll(selector).length]), waitMs);
+"""
+
 class AdaptiveScrollController:
     """Smart scrolling with adaptive timing and performance monitoring"""
     
@@ -310,23 +392,18 @@ class AdaptiveScrollController:
         self.current_wait_time = initial_wait_time
         self.metrics = ScrollMetrics()
         self.load_times = deque(maxlen=10)  # Keep last 10 load times
+        self.load_time_sum = 0.0  # Running total of load_times
         self.performance_threshold = 0.8  # Minimum success rate
     
     def adaptive_scroll_and_wait(self, browser_controller) -> bool:
         """Perform adaptive scrolling with dynamic timing"""
         start_time = time.time()
         
-        # Get initial element count
-        initial_count = browser_controller.count_ad_elements()
-        
-        # Perform scroll
-        browser_controller.sb.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        
-        # Wait with adaptive timing
-        time.sleep(self.current_wait_time)
-        
-        # Check if new content loaded
-        final_count = browser_controller.count_ad_elements()
+        # Count, scroll, wait with adaptive timing and count again in one round-trip
+        initial_count, final_count = browser_controller.sb.driver.execute_async_script(
+            ADAPTIVE_SCROLL_JS, int(self.current_wait_time * 1000),
+            browser_controller.config.AD_WRAPPER_SELECTOR,
+        )
         load_time = time.time() - start_time
         
         # Update metrics
@@ -345,8 +422,12 @@ class AdaptiveScrollController:
             self.metrics.successful_scrolls += 1
             self.metrics.elements_loaded += (final_count - initial_count)
         
+        # Keep the running total in step with the deque evicting its oldest entry
+        if len(self.load_times) == self.load_times.maxlen:
+            self.load_time_sum -= self.load_times[0]
         self.load_times.append(load_time)
-        self.metrics.average_load_time = sum(self.load_times) / len(self.load_times)
+        self.load_time_sum += load_time
+        self.metrics.average_load_time = self.load_time_sum / len(self.load_times)
         self.metrics.last_element_count = final_count
     
     def _adjust_timing(self):
@@ -388,21 +469,13 @@ class ViewportBasedScroller:
     def scroll_by_viewport(self, browser_controller) -> bool:
         """Scroll by viewport height"""
         try:
-            # Get viewport height
-            viewport_height = browser_controller.sb.execute_script(
-                "return window.innerHeight"
-            )
-            
-            # Calculate scroll distance
-            scroll_distance = int(viewport_height * self.viewport_multiplier)
-            
-            # Perform smooth scroll
-            browser_controller.sb.execute_script(f"""
-                window.scrollBy({{
-                    top: {scroll_distance},
+            # Read the viewport height and smooth scroll in the same script
+            browser_controller.sb.execute_script("""
+                window.scrollBy({
+                    top: Math.floor(window.innerHeight * arguments[0]),
                     behavior: 'smooth'
-                }});
-            """)
+                });
+            """, self.viewport_multiplier)
             
             return True
             
@@ -427,32 +500,59 @@ class ViewportBasedScroller:
             return {}
 
 
+# Installs (once per page) an IntersectionObserver that keeps window.__visibleAds up to
+# date, plus a MutationObserver that starts tracking ads as they are added; returns
+# the indices of the ads currently in the viewport
+VISIBLE_ADS_JS = """
+    const selector = arguments[0];
+    
+    if (!window.__visibleAds) {
+        window.__visibleAds = new Set();
+        let nextIndex = 0;
+        
+        const intersection = new IntersectionObserver((entries) => {
+            for (const entry of entries) {
+                const index = Number(entry.target.dataset.adIdx);
+                if (entry.isIntersecting) window.__visibleAds.add(index);
+                else window.__visibleAds.delete(index);
+            }
+        });
+        
+        const track = (el) => {
+            if (el.dataset.adIdx !== undefined) return;
+            el.dataset.adIdx = nextIndex++;
+            intersection.observe(el);
+        };
+        
+        document.querySelectorAll(selector).forEach(track);
+        new MutationObserver((mutations) => {
+            for (const mutation of mutations) {
+                for (const node of mutation.addedNodes) {
+                    if (node.nodeType !== Node.ELEMENT_NODE) continue;
+                    if (node.matches(selector)) track(node);
+                    node.querySelectorAll(selector).forEach(track);
+                }
+            }
+        }).observe(document.body, {childList: true, subtree: true});
+    }
+    
+    return Array.from(window.__visibleAds);
+"""
+
 class ElementVisibilityDetector:
     """Detect when new elements become visible"""
     
     def __init__(self):
         self.last_visible_elements = set()
-        self.element_selector = ".xrvj5dj > div"  # Ad wrapper selector
+        self.element_selector = Config.AD_WRAPPER_SELECTOR
     
     def get_visible_elements(self, browser_controller) -> set:
         """Get currently visible element identifiers"""
         try:
-            visible_elements = browser_controller.sb.execute_script(f"""
-                const elements = document.querySelectorAll('{self.element_selector}');
-                const visible = new Set();
-                
-                elements.forEach((el, index) => {{
-                    const rect = el.getBoundingClientRect();
-                    const isVisible = rect.top < window.innerHeight && rect.bottom > 0;
-                    if (isVisible) {{
-                        // Use a unique identifier (position + partial content)
-                        const id = index + '_' + (el.textContent || '').substring(0, 50);
-                        visible.add(id);
-                    }}
-                }});
-                
-                return Array.from(visible);
-            """)
+            # The browser tracks visibility itself; this only reads the current set
+            visible_elements = browser_controller.sb.execute_script(
+                VISIBLE_ADS_JS, self.element_selector
+            )
             
             return set(visible_elements)
             
@@ -481,12 +581,13 @@ class ElementVisibilityDetector:
 # ENHANCED BROWSER CONTROLLER WITH PERFORMANCE OPTIMIZATIONS
 # ============================================================================
 
-class OptimizedBrowserController:
+class OptimizedBrowserController(BrowserController):
     """Enhanced browser controller with all performance optimizations"""
     
-    def __init__(self, sb, config):
-        self.sb = sb
-        self.config = config
+    def __init__(self, sb, config=None):
+        super().__init__(sb)
+        if config is not None:
+            self.config = config
         self.adaptive_scroller = AdaptiveScrollController()
         self.viewport_scroller = ViewportBasedScroller()
         self.visibility_detector = ElementVisibilityDetector()
@@ -498,22 +599,17 @@ class OptimizedBrowserController:
         
         scroll_count = 0
         stall_count = 0
-        stop_scrolling = False
-        
-        # Setup stop mechanism
-        def check_for_stop():
-            nonlocal stop_scrolling
-            try:
-                input("Press Enter to stop scrolling...\n")
-                stop_scrolling = True
-            except:
-                pass
+        backoff = self.config.STALL_BACKOFF_START
         
-        stop_thread = threading.Thread(target=check_for_stop, daemon=True)
-        stop_thread.start()
+        # Ctrl+C sets stop_event instead of raising mid-scroll
+        print("Press Ctrl+C to stop scrolling")
+        previous_handler = self.install_stop_handler()
         
         try:
-            while not stop_scrolling:
+            # The adaptive wait (up to 8s) runs inside an async script
+            self.sb.driver.set_script_timeout(self.config.LOAD_WAIT_TIME + 10)
+            
+            while not self.stop_event.is_set() and scroll_count < self.config.MAX_SCROLL_ATTEMPTS:
                 scroll_count += 1
                 
                 # Check memory usage
@@ -532,6 +628,7 @@ class OptimizedBrowserController:
                 # Update stall counter
                 if content_loaded:
                     stall_count = 0
+                    backoff = self.config.STALL_BACKOFF_START
                 else:
                     stall_count += 1
                 
@@ -542,16 +639,26 @@ class OptimizedBrowserController:
                           f"Success Rate: {report['success_rate']:.2f} | "
                           f"Memory: {self.memory_monitor.get_memory_usage():.1f}MB")
                 
-                # Continue scrolling even with stalls (for infinite scroll)
+                # Stop once repeated stalls show the results are exhausted
                 if stall_count >= self.config.MAX_STALLS:
-                    print("Max stalls reached, but continuing...")
-                    stall_count = 0
-                    time.sleep(self.config.LOAD_WAIT_TIME)
+                    print("Max stalls reached, stopping")
+                    break
+                
+                # Back off further on each consecutive stall
+                if stall_count:
+                    self.stop_event.wait(backoff)
+                    backoff = min(backoff * self.config.STALL_BACKOFF_FACTOR, self.config.STALL_BACKOFF_MAX)
         
         except KeyboardInterrupt:
             print("\n⏹️  Scrolling stopped by user")
         except Exception as e:
             print(f"❌ Error during optimized scrolling: {e}")
+        finally:
+            if previous_handler is not None:
+                signal.signal(signal.SIGINT, previous_handler)
+        
+        if self.stop_event.is_set():
+            print("\n⏹️  Scrolling stopped by user")
         
         # Final performance report
         final_report = self.adaptive_scroller.get_performance_report()
@@ -559,15 +666,7 @@ class OptimizedBrowserController:
         for key, value in final_report.items():
             print(f"  {key}: {value}")
         
-        return self.sb.get_page_source()
-    
-    def count_ad_elements(self) -> int:
-        """Count ad elements (required by adaptive scroller)"""
-        try:
-            elements = self.sb.find_elements(self.config.AD_WRAPPER_SELECTOR)
-            return len(elements)
-        except Exception:
-            return 0
+        return self.get_page_html()
 
 
 # ============================================================================
@@ -587,20 +686,16 @@ class PerformanceOptimizedScraper:
         """Main scraping function with all optimizations"""
         
         # Process keywords concurrently
-        results = self.concurrent_processor.process_keywords_batch(
-            keywords, self
-        )
+        results = self.concurrent_processor.process_keywords_batch(keywords)
         
         # Save results asynchronously
-        save_tasks = []
         for keyword, result in results.items():
             if result['success']:
                 filepath = f"output_{keyword}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-                task = self.async_processor.save_data_async(result, filepath)
-                save_tasks.append(task)
+                await self.async_processor.save_data_async(result, filepath)
         
         # Wait for all saves to complete
-        await asyncio.gather(*save_tasks)
+        await self.async_processor.drain()
         
         print("✅ All optimized processing complete!")
         return results
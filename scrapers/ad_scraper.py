@@ -1,84 +1,108 @@
 # scrapers/ad_scraper.py
 """Facebook ads data scraper"""
 
+import os
 import re
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from itertools import repeat
 from typing import List, Dict, Any
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+
+# Numeric ID in "Library ID: 1665798290789134"
+LIBRARY_ID_PATTERN = re.compile(r'Library ID:\s*(\d+)')
+
+# Prefer lxml's C tree builder for the (multi-MB) page parse when it is installed
+try:
+    import lxml
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
 
 class FacebookAdScraper:
     def __init__(self):
-        from config import Config
+        from config import Config, CompiledSelectors
         from scrapers.media_extractor import MediaExtractor
         from utils.date_utils import extract_ad_times
         
         self.config = Config()
+        self.selectors = CompiledSelectors
+        
+        # Only the ad containers are turned into soup; the rest of the page is skipped.
+        # The strainer sees the whole class string, so match the container class as one token.
+        container_class = re.compile(rf'(?:^|\s){re.escape(self.config.AD_CONTAINER_CLASS)}(?:\s|$)')
+        self.ad_strainer = SoupStrainer("div", class_=container_class)
         self.media_extractor = MediaExtractor()
         self.extract_ad_times = extract_ad_times
     
     def extract_library_id(self, ad_wrapper):
         """Extract library ID from ad wrapper"""
         try:
-            library_id_elem = ad_wrapper.select_one(self.config.LIBRARY_ID_SELECTOR)
+            library_id_elem = self.selectors.LIBRARY_ID.select_one(ad_wrapper)
             library_id_text = library_id_elem.get_text(strip=True) if library_id_elem else ""
             
             # Extract numeric ID from "Library ID: 1665798290789134"
-            library_id_match = re.search(r'Library ID:\s*(\d+)', library_id_text)
+            library_id_match = LIBRARY_ID_PATTERN.search(library_id_text)
             return library_id_match.group(1) if library_id_match else library_id_text
         except Exception as e:
             return ""
     
-    def extract_start_date_info(self, ad_wrapper):
+    def extract_start_date_info(self, ad_wrapper, now_timestamp=None):
         """Extract start date and timing information"""
         try:
-            start_elem = ad_wrapper.select_one(self.config.START_DATE_SELECTOR)
+            start_elem = self.selectors.START_DATE.select_one(ad_wrapper)
             start_text = start_elem.get_text(strip=True) if start_elem else ""
-            return self.extract_ad_times(start_text)
+            return self.extract_ad_times(start_text, now_timestamp)
         except Exception as e:
             return {'start_at': ""}
     
-    def extract_basic_info(self, ad_wrapper):
-        """Extract basic ad information"""
-        info = {}
+    def extract_basic_info(self, ad_wrapper, info=None):
+        """Extract basic ad information (into info, if given)"""
+        if info is None:
+            info = {}
         
         # Category name
         try:
-            category_elem = ad_wrapper.select_one(self.config.CATEGORY_SELECTOR)  
+            category_elem = self.selectors.CATEGORY.select_one(ad_wrapper)
             info['category_name'] = category_elem.get_text(strip=True) if category_elem else ""
         except:
             info['category_name'] = ""
         
         # CTA
         try:
-            cta_elem = ad_wrapper.select_one(self.config.CTA_SELECTOR)
+            cta_elem = self.selectors.CTA.select_one(ad_wrapper)
             info['cta'] = cta_elem.get_text(strip=True) if cta_elem else ""
         except:
             info['cta'] = ""
         
         # Page name
         try:
-            page_name_elem = ad_wrapper.select_one(self.config.PAGE_NAME_SELECTOR)
+            page_name_elem = self.selectors.PAGE_NAME.select_one(ad_wrapper)
             info['page_name'] = page_name_elem.get_text(strip=True) if page_name_elem else ""
         except:
             info['page_name'] = ""
         
-        # Page image link
+        # Page image link (the same anchor also gives the page link below)
         try:
-            page_img_elem = ad_wrapper.select_one(self.config.PAGE_IMAGE_LINK_SELECTOR)
-            info['page_image_link'] = page_img_elem.get('href', '') if page_img_elem else ""
+            page_link_elem = self.selectors.PAGE_IMAGE_LINK.select_one(ad_wrapper)
+        except:
+            page_link_elem = None
+        
+        try:
+            info['page_image_link'] = page_link_elem.get('href', '') if page_link_elem else ""
         except:
             info['page_image_link'] = ""
         
         # Ad description
         try:
-            desc_elem = ad_wrapper.select_one(self.config.AD_DESCRIPTION_SELECTOR)
+            desc_elem = self.selectors.AD_DESCRIPTION.select_one(ad_wrapper)
             info['ad_description'] = desc_elem.get_text(strip=True) if desc_elem else ""
         except:
             info['ad_description'] = ""
         
         # Page link
         try:
-            page_link_elem = ad_wrapper.select_one(self.config.PAGE_IMAGE_LINK_SELECTOR)
             info['page_link'] = page_link_elem.get_text(strip=True) if page_link_elem else ""
         except:
             info['page_link'] = ""
@@ -88,7 +112,7 @@ class FacebookAdScraper:
     def extract_media_info(self, ad_wrapper):
         """Extract media links and assets"""
         try:
-            target_element = ad_wrapper.select_one(self.config.MEDIA_CONTAINER_SELECTOR)
+            target_element = self.selectors.MEDIA_CONTAINER.select_one(ad_wrapper)
             
             if target_element:
                 return self.media_extractor.extract_media_links(target_element)
@@ -98,7 +122,7 @@ class FacebookAdScraper:
         except Exception as e:
             return {'images': [], 'videos': [], 'audio': []}
     
-    def scrape_single_ad(self, ad_wrapper, keyword):
+    def scrape_single_ad(self, ad_wrapper, keyword, now_timestamp=None, scraped_at=None):
         """Scrape data from a single ad wrapper element"""
         ad_data = {}
         
@@ -106,38 +130,69 @@ class FacebookAdScraper:
         ad_data['library_id'] = self.extract_library_id(ad_wrapper)
         
         # Extract timing information
-        timing_info = self.extract_start_date_info(ad_wrapper)
+        timing_info = self.extract_start_date_info(ad_wrapper, now_timestamp)
         ad_data.update(timing_info)
         
-        # Extract basic information
-        basic_info = self.extract_basic_info(ad_wrapper)
-        ad_data.update(basic_info)
+        # Extract basic information straight into the record
+        self.extract_basic_info(ad_wrapper, ad_data)
         
         # Extract media information
         ad_data['media_links'] = self.extract_media_info(ad_wrapper)
         
         # Add metadata
         ad_data['keyword'] = keyword
-        ad_data['scraped_at'] = datetime.now().isoformat()
+        ad_data['scraped_at'] = scraped_at or datetime.now().isoformat()
         
         return ad_data
     
+    def should_scrape_in_parallel(self, ad_count):
+        """Check whether a page is big enough, and cores free enough, for the process pool"""
+        return (ad_count >= self.config.PARALLEL_PARSE_MIN_ADS
+                and (os.cpu_count() or 1) > 1
+                and multiprocessing.parent_process() is None)
+    
+    def scrape_ads_in_parallel(self, ad_wrappers, keyword, now_timestamp, scraped_at):
+        """Scrape ad wrappers in worker processes, in chunks of serialized HTML"""
+        # Each chunk keeps the ad container around its wrappers so selectors match as on the page
+        container = f'<div class="{self.config.AD_CONTAINER_CLASS}">{{}}</div>'
+        chunk_size = self.config.AD_PARSE_CHUNK_SIZE
+        chunks = [
+            container.format(''.join(map(str, ad_wrappers[i:i + chunk_size])))
+            for i in range(0, len(ad_wrappers), chunk_size)
+        ]
+        print(f"Processing {len(ad_wrappers)} ads in {len(chunks)} chunks across processes")
+        
+        workers = min(os.cpu_count() or 1, len(chunks))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            results = executor.map(
+                scrape_ad_chunk, chunks, repeat(keyword), repeat(now_timestamp), repeat(scraped_at)
+            )
+            return [ad_data for chunk_data in results for ad_data in chunk_data]
+    
     def scrape_facebook_ads(self, html_content, keyword):
         """Scrape Facebook ads data from HTML content"""
         try:
             print("\n🔍 Starting data extraction...")
             
-            soup = BeautifulSoup(html_content, 'html.parser')
-            ad_wrappers = soup.select(self.config.AD_WRAPPER_SELECTOR)
+            soup = BeautifulSoup(html_content, HTML_PARSER, parse_only=self.ad_strainer)
+            ad_wrappers = self.selectors.AD_WRAPPER.select(soup)
             print(f"📊 Found {len(ad_wrappers)} ad elements to scrape")
             
             scraped_data = []
             
-            for i, ad_wrapper in enumerate(ad_wrappers, 1):
-                print(f"Processing ad {i}/{len(ad_wrappers)}", end='\r')
-                
-                ad_data = self.scrape_single_ad(ad_wrapper, keyword)
-                scraped_data.append(ad_data)
+            # One clock reading for the whole page, used for scraped_at and calculated durations
+            now = datetime.now()
+            now_timestamp = int(now.timestamp())
+            scraped_at = now.isoformat()
+            
+            if self.should_scrape_in_parallel(len(ad_wrappers)):
+                scraped_data = self.scrape_ads_in_parallel(ad_wrappers, keyword, now_timestamp, scraped_at)
+            else:
+                for i, ad_wrapper in enumerate(ad_wrappers, 1):
+                    print(f"Processing ad {i}/{len(ad_wrappers)}", end='\r')
+                    
+                    ad_data = self.scrape_single_ad(ad_wrapper, keyword, now_timestamp, scraped_at)
+                    scraped_data.append(ad_data)
             
             print(f"\n✓ Successfully scraped {len(scraped_data)} ads")
             return scraped_data
@@ -147,3 +202,13 @@ class FacebookAdScraper:
             import traceback
             traceback.print_exc()
             return []
+
+
+def scrape_ad_chunk(chunk_html, keyword, now_timestamp, scraped_at):
+    """Re-parse a chunk of serialized ad wrappers and scrape it (runs in a worker process)"""
+    scraper = FacebookAdScraper()
+    soup = BeautifulSoup(chunk_html, HTML_PARSER, parse_only=scraper.ad_strainer)
+    return [
+        scraper.scrape_single_ad(ad_wrapper, keyword, now_timestamp, scraped_at)
+        for ad_wrapper in scraper.selectors.AD_WRAPPER.select(soup)
+    ]
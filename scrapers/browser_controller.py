@@ -2,133 +2,286 @@
 """Browser control and scrolling functionality"""
 
 import time
+import signal
 import threading
 from typing import Optional
 
+# Scrolls to the bottom and resolves once new ads appear in the ad container (or the
+# page grows) or the timeout expires, with [height, number of ad elements]
+SCROLL_AND_WAIT_JS = """
+    const timeoutMs = arguments[0];
+    const adSelector = arguments[1];
+    const containerSelector = arguments[2];
+    const done = arguments[arguments.length - 1];
+    const startHeight = document.body.scrollHeight;
+    const startCount = document.querySelectorAll(adSelector).length;
+    let finished = false;
+    
+    const finish = () => {
+        if (finished) return;
+        finished = true;
+        observer.disconnect();
+        clearTimeout(timer);
+        done([document.body.scrollHeight, document.querySelectorAll(adSelector).length]);
+    };
+    
+    // Watch only the ad list when it exists, rather than every change on the page
+    const target = document.querySelector(containerSelector) || document.body;
+    const observer = new MutationObserver(() => {
+        if (document.querySelectorAll(adSelector).length > startCount ||
+                document.body.scrollHeight > startHeight) finish();
+    });
+    observer.observe(target, {childList: true, subtree: true});
+    const timer = setTimeout(finish, timeoutMs);
+    
+    window.scrollTo(0, startHeight);
+"""
+
+# Steps down the page (pausing in the browser between steps so lazy loading can
+# kick in), nudges back up and returns to the bottom, resolving with the height
+INCREMENTAL_SCROLL_JS = """
+    const stepDelayMs = arguments[0];
+    const done = arguments[arguments.length - 1];
+    const startHeight = document.body.scrollHeight;
+    const steps = window.pageYOffset < startHeight - 1000 ? 3 : 0;
+    let step = 0;
+    
+    const finish = () => {
+        window.scrollBy(0, -500);
+        window.scrollTo(0, document.body.scrollHeight);
+        done(document.body.scrollHeight);
+    };
+    
+    const next = () => {
+        if (step++ >= steps) return finish();
+        window.scrollBy(0, Math.floor(startHeight / 4));
+        setTimeout(next, stepDelayMs);
+    };
+    next();
+"""
+
+# Resolves with the page height once no new resources have loaded for quietMs,
+# or after timeoutMs
+NETWORK_IDLE_JS = """
+    const timeoutMs = arguments[0];
+    const quietMs = arguments[1];
+    const done = arguments[arguments.length - 1];
+    let quietTimer = null;
+    
+    const finish = () => {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(deadline);
+        done(document.body.scrollHeight);
+    };
+    
+    const observer = new PerformanceObserver(() => {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(finish, quietMs);
+    });
+    observer.observe({type: 'resource'});
+    
+    quietTimer = setTimeout(finish, quietMs);
+    const deadline = setTimeout(finish, timeoutMs);
+"""
+
+# Reports page metrics plus loading-indicator and load-more button presence.
+# Supports jQuery-style "tag:contains('text')" selectors like SeleniumBase does.
+PAGE_STATE_JS = """
+    const progressSelector = arguments[0];
+    const loadMoreSelectors = arguments[1];
+    
+    const isPresent = (selector) => {
+        const contains = selector.match(/^(.*):contains\\(['"](.*)['"]\\)$/);
+        try {
+            if (contains) {
+                return Array.from(document.querySelectorAll(contains[1] || '*'))
+                    .some((el) => el.textContent.includes(contains[2]));
+            }
+            return document.querySelector(selector) !== null;
+        } catch (e) {
+            return false;
+        }
+    };
+    
+    return {
+        height: document.body.scrollHeight,
+        position: window.pageYOffset,
+        progressBar: isPresent(progressSelector),
+        loadMoreSelector: loadMoreSelectors.find(isPresent) || null
+    };
+"""
+
 class BrowserController:
     def __init__(self, sb):
         self.sb = sb
         from config import Config
         self.config = Config()
+        self.stop_event = threading.Event()
+        
+        # Load more selector that matched last time on the current page
+        self.cached_load_more_selector = None
+        
+        # Viewport center of the current page, read once on first use
+        self.viewport_center = None
     
     def count_ad_elements(self):
-        """Count elements matching the ad selector"""
+        """Count elements matching the ad selector (in the page, without element handles)"""
         try:
-            elements = self.sb.find_elements(self.config.AD_WRAPPER_SELECTOR)
-            return len(elements)
+            return self.sb.execute_script(
+                "return document.querySelectorAll(arguments[0]).length;",
+                self.config.AD_WRAPPER_SELECTOR,
+            ) or 0
         except Exception as e:
             print(f"Error counting elements: {e}")
             return 0
     
+    def probe_page_state(self):
+        """Read page height, scroll position and loading/load-more probes in one round-trip"""
+        # Probe the last matching selector first; the JS stops at the first hit
+        load_more_selectors = list(self.config.LOAD_MORE_SELECTORS)
+        if self.cached_load_more_selector:
+            load_more_selectors.remove(self.cached_load_more_selector)
+            load_more_selectors.insert(0, self.cached_load_more_selector)
+        
+        state = self.sb.execute_script(
+            PAGE_STATE_JS, self.config.PROGRESS_BAR_SELECTOR, load_more_selectors
+        )
+        self.cached_load_more_selector = state['loadMoreSelector']
+        return state
+    
     def try_load_more_content(self):
         """Try various methods to trigger loading more content"""
         try:
+            state = self.probe_page_state()
+            
             # Check for loading indicators
-            if self.sb.is_element_present("div[role='progressbar']"):
+            if state['progressBar']:
                 print("Found loading indicator, waiting...")
-                time.sleep(self.config.LOAD_WAIT_TIME)
-            
-            # Try to find and click load more buttons
-            load_more_selectors = [
-                "[data-testid='more-items-button']",
-                "button:contains('See more')",
-                "button:contains('Load more')",
-                "[aria-label*='more']"
-            ]
+                try:
+                    self.sb.wait_for_element_not_visible(
+                        self.config.PROGRESS_BAR_SELECTOR, timeout=self.config.LOAD_WAIT_TIME
+                    )
+                except Exception:
+                    print("Loading indicator still visible, continuing...")
             
-            for selector in load_more_selectors:
-                if self.sb.is_element_present(selector):
-                    print(f"Found load more button: {selector}")
-                    self.sb.click(selector)
-                    time.sleep(3)
-                    break
+            # Click the first load more button found by the probe
+            selector = state['loadMoreSelector']
+            if selector:
+                print(f"Found load more button: {selector}")
+                self.sb.click(selector)
+                self.wait_for_network_idle()
                     
         except Exception as e:
             print(f"Error trying load more: {e}")
     
+    def scroll_and_wait_for_growth(self):
+        """Scroll to the bottom and wait for new content; returns (height, ad element count)"""
+        timeout_ms = int(self.config.LOAD_WAIT_TIME * 1000)
+        height, element_count = self.sb.driver.execute_async_script(
+            SCROLL_AND_WAIT_JS, timeout_ms, self.config.AD_WRAPPER_SELECTOR,
+            f".{self.config.AD_CONTAINER_CLASS}",
+        )
+        return height, element_count
+    
+    def wait_for_network_idle(self, timeout=3, quiet_time=0.4):
+        """Wait until the page stops fetching resources (at most timeout seconds), returning the height"""
+        try:
+            return self.sb.driver.execute_async_script(
+                NETWORK_IDLE_JS, int(timeout * 1000), int(quiet_time * 1000)
+            )
+        except Exception:
+            time.sleep(timeout)
+            return None
+    
+    def incremental_scroll(self):
+        """Scroll down in steps to trigger lazy loading, returning the page height"""
+        return self.sb.driver.execute_async_script(INCREMENTAL_SCROLL_JS, 1000)
+    
     def simulate_user_interaction(self):
         """Simulate user interactions to trigger content loading"""
+        if self.viewport_center is None:
+            self.viewport_center = self.sb.execute_script(
+                "return [window.innerWidth / 2, window.innerHeight / 2];"
+            )
+        
+        # Trigger scroll events
         self.sb.execute_script("""
-            // Trigger scroll events
             window.dispatchEvent(new Event('scroll'));
             window.dispatchEvent(new Event('resize'));
-            
-            // Simulate mouse movement
-            const event = new MouseEvent('mousemove', {
-                view: window,
-                bubbles: true,
-                cancelable: true,
-                clientX: window.innerWidth / 2,
-                clientY: window.innerHeight / 2
-            });
-            document.dispatchEvent(event);
         """)
+        
+        # Move the mouse through CDP so the page sees a native input event
+        x, y = self.viewport_center
+        try:
+            self.sb.driver.execute_cdp_cmd(
+                'Input.dispatchMouseEvent', {'type': 'mouseMoved', 'x': x, 'y': y}
+            )
+        except Exception as e:
+            print(f"Error simulating mouse movement: {e}")
+    
+    def get_page_html(self):
+        """Get the rendered DOM over CDP, falling back to the WebDriver page source"""
+        try:
+            document = self.sb.driver.execute_cdp_cmd('DOM.getDocument', {'depth': 0})
+            result = self.sb.driver.execute_cdp_cmd(
+                'DOM.getOuterHTML', {'nodeId': document['root']['nodeId']}
+            )
+            return result['outerHTML']
+        except Exception as e:
+            print(f"CDP HTML capture failed, using page source: {e}")
+            return self.sb.get_page_source()
+    
+    def install_stop_handler(self):
+        """Make Ctrl+C (SIGINT) stop scrolling gracefully; returns the previous handler"""
+        self.stop_event.clear()
+        try:
+            return signal.signal(signal.SIGINT, lambda signum, frame: self.stop_event.set())
+        except ValueError:
+            # Signal handlers can only be installed from the main thread
+            return None
     
     def scroll_to_bottom_and_get_html(self):
         """Improved infinite scrolling function for Facebook Ads Library"""
-        print("Starting infinite scroll...")
+        print(f"Starting infinite scroll (up to {self.config.MAX_SCROLL_ATTEMPTS} attempts)...")
         print("Press Ctrl+C to stop scrolling, or close the browser window")
         
         scroll_count = 0
-        stop_scrolling = False
         last_height = 0
         stall_count = 0
+        backoff = self.config.STALL_BACKOFF_START
         
-        def check_for_stop():
-            nonlocal stop_scrolling
-            try:
-                input("Press Enter to stop scrolling...\n")
-                stop_scrolling = True
-            except:
-                pass
+        previous_handler = self.install_stop_handler()
         
-        # Start a thread to listen for user input
-        stop_thread = threading.Thread(target=check_for_stop, daemon=True)
-        stop_thread.start()
+        # A new page is being scrolled, so forget what was cached for the last one
+        self.cached_load_more_selector = None
+        self.viewport_center = None
         
         try:
             # Wait for initial page load
-            self.sb.sleep(2)
+            self.sb.wait_for_ready_state_complete()
+            self.sb.driver.set_script_timeout(self.config.LOAD_WAIT_TIME + 10)
+            self.wait_for_network_idle(timeout=self.config.LOAD_WAIT_TIME)
             print("Page loaded, starting scroll...")
             
             # Count initial elements
             initial_count = self.count_ad_elements()
             print(f"📊 Initial element count: {initial_count}")
+            last_count = initial_count
             
-            while not stop_scrolling:
+            while not self.stop_event.is_set() and scroll_count < self.config.MAX_SCROLL_ATTEMPTS:
                 scroll_count += 1
                 
-                # Multiple scroll methods
-                self.sb.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(2)
-                
-                try:
-                    self.sb.scroll_to_bottom()
-                except:
-                    pass
-                
-                # Incremental scrolls
-                current_position = self.sb.execute_script("return window.pageYOffset;")
-                page_height = self.sb.execute_script("return document.body.scrollHeight")
-                
-                if current_position < page_height - 1000:
-                    for i in range(3):
-                        self.sb.execute_script(f"window.scrollBy(0, {page_height // 4});")
-                        time.sleep(1)
-                
-                # Final scroll to bottom
-                self.sb.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(self.config.LOAD_WAIT_TIME)
-                
-                # Count elements and check for new content
-                element_count = self.count_ad_elements()
+                # Scroll, wait for the page to grow (or time out) and count ads in one round-trip
+                new_height, element_count = self.scroll_and_wait_for_growth()
                 print(f"📊 Current element count: {element_count}")
                 
-                new_height = self.sb.execute_script("return document.body.scrollHeight")
-                
-                if new_height > last_height:
-                    last_height = new_height
+                # New ads (or a taller page) count as progress
+                if new_height > last_height or element_count > last_count:
+                    last_height = max(last_height, new_height)
+                    last_count = max(last_count, element_count)
                     stall_count = 0
+                    backoff = self.config.STALL_BACKOFF_START
                 else:
                     stall_count += 1
                     
@@ -136,31 +289,34 @@ class BrowserController:
                         print("Trying alternative scroll methods...")
                         
                         # Alternative loading methods
-                        self.sb.execute_script("window.scrollBy(0, -500);")
-                        time.sleep(1)
-                        self.sb.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                        time.sleep(3)
+                        recovery_height = self.incremental_scroll()
+                        self.wait_for_network_idle()
                         
                         self.try_load_more_content()
                         self.simulate_user_interaction()
-                        time.sleep(3)
                         
-                        # Check again
-                        final_height = self.sb.execute_script("return document.body.scrollHeight")
+                        # Check again, reusing the height the idle wait reports
+                        final_height = self.wait_for_network_idle() or recovery_height
                         final_element_count = self.count_ad_elements()
                         print(f"📊 Final element count: {final_element_count}")
                         
-                        if final_height > last_height:
-                            last_height = final_height
+                        if final_height > last_height or final_element_count > last_count:
+                            last_height = max(last_height, final_height)
+                            last_count = max(last_count, final_element_count)
                             stall_count = 0
+                            backoff = self.config.STALL_BACKOFF_START
                 
-                # Continue even if stalled (infinite scroll)
+                # Nothing new after repeated recovery attempts: the results are exhausted
                 if stall_count >= self.config.MAX_STALLS:
-                    print("Reached max stalls, but continuing infinite scroll...")
-                    stall_count = 0
-                    time.sleep(self.config.LOAD_WAIT_TIME)
+                    print("Reached max stalls, no more content is loading")
+                    break
                 
-                time.sleep(self.config.SCROLL_WAIT_TIME)
+                # Give a slow page progressively longer before the next attempt. After
+                # progress there is no fixed pause: the next scroll waits for new ads itself.
+                if stall_count:
+                    self.stop_event.wait(backoff)
+                    backoff = min(backoff * self.config.STALL_BACKOFF_FACTOR, self.config.STALL_BACKOFF_MAX)
+                    self.wait_for_network_idle(timeout=self.config.SCROLL_WAIT_TIME)
                 
         except KeyboardInterrupt:
             print("\nScrolling stopped by user (Ctrl+C)")
@@ -168,6 +324,12 @@ class BrowserController:
             print(f"Error during scrolling: {e}")
             import traceback
             traceback.print_exc()
+        finally:
+            if previous_handler is not None:
+                signal.signal(signal.SIGINT, previous_handler)
+        
+        if self.stop_event.is_set():
+            print("\nScrolling stopped by user (Ctrl+C)")
         
         print(f"Finished scrolling. Total attempts: {scroll_count}, Final height: {last_height}")
-        return self.sb.get_page_source()
+        return self.get_page_html()
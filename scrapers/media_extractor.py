@@ -2,25 +2,58 @@
 """Media extraction utilities"""
 
 import re
+from functools import lru_cache
 from urllib.parse import urljoin, urlparse
 from typing import Dict, List, Optional
 from bs4 import BeautifulSoup, Tag
 
+# URLs inside inline CSS background-image / mask-image properties, in one scan
+CSS_IMAGE_PATTERN = re.compile(r'(?:background|mask)-image:\s*url\(["\']?([^"\']+)["\']?\)')
+
+@lru_cache(maxsize=65536)
+def url_extension(url):
+    """Get the lowercased extension of a URL path (cached, as CDN URLs repeat across ads)"""
+    # Only the path counts, so a bare host like https://example.mov has no extension
+    try:
+        path = urlparse(url).path
+    except ValueError:
+        return ""
+    
+    extension = path[path.rfind('.'):] if '.' in path else ""
+    return extension.lower() if '/' not in extension else ""
+
 class MediaExtractor:
     def __init__(self):
         from config import Config
         self.image_extensions = Config.IMAGE_EXTENSIONS
         self.video_extensions = Config.VIDEO_EXTENSIONS  
         self.audio_extensions = Config.AUDIO_EXTENSIONS
+        self.all_extensions = self.image_extensions | self.video_extensions | self.audio_extensions
+        
+        # Extension -> media bucket lookup
+        self.extension_buckets = {}
+        for extensions, bucket in ((self.image_extensions, 'images'),
+                                   (self.video_extensions, 'videos'),
+                                   (self.audio_extensions, 'audio')):
+            self.extension_buckets.update(dict.fromkeys(extensions, bucket))
+        
+        # Absolute URLs ending in any known media extension
+        self.media_url_pattern = re.compile(
+            r'https?://[^\s<>"\']+\.(?:' + '|'.join(ext.strip('.') for ext in self.all_extensions) + r')',
+            re.IGNORECASE,
+        )
+    
+    def get_url_extension(self, url):
+        """Get the lowercased extension of a URL path (e.g. '.jpg')"""
+        return url_extension(url)
     
     def is_media_url(self, url, extensions):
         """Check if URL has media extension"""
-        try:
-            parsed = urlparse(url.lower())
-            path = parsed.path
-            return any(path.endswith(ext) for ext in extensions)
-        except:
-            return False
+        return self.get_url_extension(url) in extensions
+    
+    def classify_media_url(self, url):
+        """Get the media bucket ('images', 'videos', 'audio') for a URL, or None"""
+        return self.extension_buckets.get(self.get_url_extension(url))
     
     def resolve_url(self, url, base_url = None):
         """Resolve relative URLs if base_url is provided"""
@@ -28,151 +61,95 @@ class MediaExtractor:
             return urljoin(base_url, url)
         return url
     
-    def extract_from_img_tags(self, element, base_url = None):
-        """Extract image URLs from img tags"""
-        images = []
-        img_tags = element.find_all('img')
-        
-        for img in img_tags:
-            # Regular src
-            src = img.get('src')
-            if src:
-                images.append(self.resolve_url(src, base_url))
-            
-            # Lazy loading data-src
-            data_src = img.get('data-src')
-            if data_src:
-                images.append(self.resolve_url(data_src, base_url))
-        
-        return images
-    
-    def extract_from_video_tags(self, element, base_url = None):
-        """Extract video URLs from video tags"""
-        videos = []
-        video_tags = element.find_all('video')
-        
-        for video in video_tags:
-            # Video src
-            src = video.get('src')
-            if src:
-                videos.append(self.resolve_url(src, base_url))
-            
-            # Source tags within video
-            source_tags = video.find_all('source')
-            for source in source_tags:
-                src = source.get('src')
-                if src:
-                    videos.append(self.resolve_url(src, base_url))
-        
-        return videos
-    
-    def extract_from_audio_tags(self, element, base_url = None):
-        """Extract audio URLs from audio tags"""
-        audio = []
-        audio_tags = element.find_all('audio')
-        
-        for audio_tag in audio_tags:
-            # Audio src
-            src = audio_tag.get('src')
-            if src:
-                audio.append(self.resolve_url(src, base_url))
-            
-            # Source tags within audio
-            source_tags = audio_tag.find_all('source')
-            for source in source_tags:
-                src = source.get('src')
-                if src:
-                    audio.append(self.resolve_url(src, base_url))
-        
-        return audio
+    def add_urls(self, urls, base_url, *candidates):
+        """Resolve and add the non-empty candidate URLs to an ordered URL set (a dict)"""
+        for url in candidates:
+            if url:
+                urls[self.resolve_url(url, base_url)] = None
     
-    def extract_from_css(self, element, base_url = None):
-        """Extract URLs from CSS background-image and mask-image"""
-        images = []
-        all_elements = element.find_all(True)
-        
-        for elem in all_elements:
-            style = elem.get('style', '')
-            if style:
-                # Background-image URLs
-                bg_matches = re.findall(r'background-image:\s*url\(["\']?([^"\']+)["\']?\)', style)
-                for match in bg_matches:
-                    resolved_url = self.resolve_url(match, base_url)
-                    if self.is_media_url(resolved_url, self.image_extensions):
-                        images.append(resolved_url)
-                
-                # Mask-image URLs
-                mask_matches = re.findall(r'mask-image:\s*url\(["\']?([^"\']+)["\']?\)', style)
-                for match in mask_matches:
-                    resolved_url = self.resolve_url(match, base_url)
-                    if self.is_media_url(resolved_url, self.image_extensions):
-                        images.append(resolved_url)
-        
-        return images
+    def get_source_bucket(self, source, root):
+        """Get the bucket of the video/audio tag (inside root) that a source tag belongs to"""
+        for parent in source.parents:
+            if parent is root:
+                return None
+            if parent.name in ('video', 'audio'):
+                return 'videos' if parent.name == 'video' else 'audio'
+        return None
     
-    def extract_from_links(self, element, base_url = None):
-        """Extract media URLs from anchor tags"""
-        media_links = {'images': [], 'videos': [], 'audio': []}
-        a_tags = element.find_all('a', href=True)
+    def extract_from_text(self, text, base_url = None):
+        """Extract media URLs from text content and attributes, as ordered URL sets (dicts)"""
+        media_links = {'images': {}, 'videos': {}, 'audio': {}}
         
-        for a in a_tags:
-            href = a.get('href')
-            if href:
-                resolved_url = self.resolve_url(href, base_url)
-                if self.is_media_url(resolved_url, self.image_extensions):
-                    media_links['images'].append(resolved_url)
-                elif self.is_media_url(resolved_url, self.video_extensions):
-                    media_links['videos'].append(resolved_url)
-                elif self.is_media_url(resolved_url, self.audio_extensions):
-                    media_links['audio'].append(resolved_url)
-        
-        return media_links
-    
-    def extract_from_text(self, element, base_url = None):
-        """Extract media URLs from text content and attributes"""
-        media_links = {'images': [], 'videos': [], 'audio': []}
+        # Most ad text holds no absolute URL at all, so skip the regex for it
+        if '://' not in text:
+            return media_links
         
-        all_text = element.get_text() + ' ' + str(element)
-        all_extensions = self.image_extensions | self.video_extensions | self.audio_extensions
-        url_pattern = r'https?://[^\s<>"\']+\.(?:' + '|'.join(ext.strip('.') for ext in all_extensions) + r')'
-        text_urls = re.findall(url_pattern, all_text, re.IGNORECASE)
+        text_urls = self.media_url_pattern.findall(text)
         
         for url in text_urls:
             resolved_url = self.resolve_url(url, base_url)
-            if self.is_media_url(resolved_url, self.image_extensions):
-                media_links['images'].append(resolved_url)
-            elif self.is_media_url(resolved_url, self.video_extensions):
-                media_links['videos'].append(resolved_url)
-            elif self.is_media_url(resolved_url, self.audio_extensions):
-                media_links['audio'].append(resolved_url)
+            bucket = self.classify_media_url(resolved_url)
+            if bucket:
+                media_links[bucket][resolved_url] = None
         
         return media_links
     
     def extract_media_links(self, element: Optional[Tag], base_url = None):
-        """Extract all media links from an element"""
+        """Extract all media links from an element in a single walk over its descendants"""
         if not element:
             return {'images': [], 'videos': [], 'audio': []}
         
-        media_links = {'images': [], 'videos': [], 'audio': []}
-        
-        # Extract from different sources
-        media_links['images'].extend(self.extract_from_img_tags(element, base_url))
-        media_links['videos'].extend(self.extract_from_video_tags(element, base_url))
-        media_links['audio'].extend(self.extract_from_audio_tags(element, base_url))
-        media_links['images'].extend(self.extract_from_css(element, base_url))
-        
-        # Extract from links
-        link_media = self.extract_from_links(element, base_url)
-        for key in media_links:
-            media_links[key].extend(link_media[key])
+        # Collected per source so the result keeps img/video/audio tags, then CSS,
+        # then links, then text, as separate passes over the tree used to. Dicts
+        # serve as ordered sets, so repeated URLs are dropped as they are found.
+        tag_media = {'images': {}, 'videos': {}, 'audio': {}}
+        css_images = {}
+        link_media = {'images': {}, 'videos': {}, 'audio': {}}
+        attribute_values = []
+        
+        for elem in element.find_all(True):
+            name = elem.name
+            # Every attribute is scanned along with the text (poster, srcset, style
+            # shorthands, data-* URLs, ...), as the serialized subtree used to be
+            attribute_values.extend(value for value in elem.attrs.values() if isinstance(value, str))
+            
+            if name == 'img':
+                # Regular src and lazy loading data-src
+                self.add_urls(tag_media['images'], base_url, elem.get('src'), elem.get('data-src'))
+            elif name == 'video':
+                self.add_urls(tag_media['videos'], base_url, elem.get('src'))
+            elif name == 'audio':
+                self.add_urls(tag_media['audio'], base_url, elem.get('src'))
+            elif name == 'source':
+                bucket = self.get_source_bucket(elem, element)
+                if bucket:
+                    self.add_urls(tag_media[bucket], base_url, elem.get('src'))
+            elif name == 'a':
+                href = elem.get('href')
+                if href:
+                    resolved_url = self.resolve_url(href, base_url)
+                    bucket = self.classify_media_url(resolved_url)
+                    if bucket:
+                        link_media[bucket][resolved_url] = None
+            
+            # CSS background-image and mask-image URLs; the substring test skips the
+            # regex for the vast majority of styles, which set no image at all
+            style = elem.get('style')
+            if style and 'image:' in style:
+                for match in CSS_IMAGE_PATTERN.findall(style):
+                    resolved_url = self.resolve_url(match, base_url)
+                    if self.is_media_url(resolved_url, self.image_extensions):
+                        css_images[resolved_url] = None
         
-        # Extract from text
-        text_media = self.extract_from_text(element, base_url)
-        for key in media_links:
-            media_links[key].extend(text_media[key])
+        # Scan the text and URL-bearing attributes gathered above, rather than
+        # serializing the whole subtree back to HTML
+        all_text = element.get_text(' ') + ' ' + ' '.join(attribute_values)
+        text_media = self.extract_from_text(all_text, base_url)
         
-        # Remove duplicates while preserving order
-        for key in media_links:
-            media_links[key] = list(dict.fromkeys(media_links[key]))
+        # Merging keeps each URL at its first position
+        tag_media['images'].update(css_images)
+        for key, urls in tag_media.items():
+            urls.update(link_media[key])
+            urls.update(text_media[key])
         
-        return media_links
+        return {key: list(urls) for key, urls in tag_media.items()}
@@ -0,0 +1,36 @@
+# tests/test_ad_scraper.py
+"""Tests for the Facebook ads data scraper"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers.ad_scraper import FacebookAdScraper, scrape_ad_chunk
+
+# Facebook serves the ad container with several classes besides the configured one
+MULTI_CLASS_PAGE = """
+<html><body>
+  <div class="x1abc xrvj5dj x2def">
+    <div><div class="x1rg5ohu"><span class="xw23nyj">Library ID: 111</span></div></div>
+    <div><div class="x1rg5ohu"><span class="xw23nyj">Library ID: 222</span></div></div>
+  </div>
+  <div class="xrvj5djx">
+    <div><div class="x1rg5ohu"><span class="xw23nyj">Library ID: 333</span></div></div>
+  </div>
+</body></html>
+"""
+
+class MultiClassContainerTest(unittest.TestCase):
+    def test_serial_scrape_finds_ads_in_multi_class_container(self):
+        data = FacebookAdScraper().scrape_facebook_ads(MULTI_CLASS_PAGE, "kw")
+        self.assertEqual([ad['library_id'] for ad in data], ['111', '222'])
+
+    def test_chunk_scrape_finds_ads_in_multi_class_container(self):
+        data = scrape_ad_chunk(MULTI_CLASS_PAGE, "kw", 0, "2024-01-01T00:00:00")
+        self.assertEqual([ad['library_id'] for ad in data], ['111', '222'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,71 +5,60 @@ import re
 from datetime import datetime
 from typing import Dict, Any
 
+# Duration components, e.g. "1 day 3 hrs 30 mins", and the seconds in each unit
+DURATION_PATTERN = re.compile(r'(\d+)\s*(day|hr|hour|min|sec)')
+DURATION_UNIT_SECONDS = {'day': 24 * 3600, 'hr': 3600, 'hour': 3600, 'min': 60, 'sec': 1}
+
+# Pieces of the ad's "Started running on ... · Total active time ..." text
+START_DATE_PATTERN = re.compile(r'Started running on\s+(\d{1,2}\s+\w+\s+\d{4})')
+ACTIVE_TIME_PATTERN = re.compile(r'Total active time\s+(.+?)(?:\s*$|·)')
+
+# Full and abbreviated month names -> month number, for "12 January 2024" / "12 Jan 2024"
+MONTH_NAMES = ('january', 'february', 'march', 'april', 'may', 'june', 'july',
+               'august', 'september', 'october', 'november', 'december')
+MONTH_NUMBERS = {name: number for number, name in enumerate(MONTH_NAMES, 1)}
+MONTH_NUMBERS.update({name[:3]: number for number, name in enumerate(MONTH_NAMES, 1)})
+
+def parse_start_date_timestamp(date_str):
+    """Convert a 'day month year' date to a (local time) Unix timestamp, or "" if invalid"""
+    try:
+        day, month, year = date_str.split()
+        return int(datetime(int(year), MONTH_NUMBERS[month.lower()], int(day)).timestamp())
+    except (KeyError, ValueError):
+        return ""
+
 def parse_duration_to_seconds(duration_str):
     """Convert duration string like '3 hrs', '2 days', '1 hr 30 mins' to seconds"""
-    total_seconds = 0
-    duration_str = duration_str.lower()
-    
-    # Handle days
-    days_match = re.search(r'(\d+)\s*(?:day|days)', duration_str)
-    if days_match:
-        total_seconds += int(days_match.group(1)) * 24 * 3600
-    
-    # Handle hours
-    hours_match = re.search(r'(\d+)\s*(?:hr|hrs|hour|hours)', duration_str)
-    if hours_match:
-        total_seconds += int(hours_match.group(1)) * 3600
-    
-    # Handle minutes
-    minutes_match = re.search(r'(\d+)\s*(?:min|mins|minute|minutes)', duration_str)
-    if minutes_match:
-        total_seconds += int(minutes_match.group(1)) * 60
+    # One scan over the string; only the first amount given for each unit counts
+    amounts = {}
+    for amount, unit in DURATION_PATTERN.findall(duration_str.lower()):
+        amounts.setdefault(DURATION_UNIT_SECONDS[unit], int(amount))
     
-    # Handle seconds
-    seconds_match = re.search(r'(\d+)\s*(?:sec|secs|second|seconds)', duration_str)
-    if seconds_match:
-        total_seconds += int(seconds_match.group(1))
-    
-    return total_seconds
+    return sum(unit_seconds * amount for unit_seconds, amount in amounts.items())
+
+# Units for formatting durations, largest first (years and months are approximate)
+DURATION_FORMAT_UNITS = (
+    ('year', 'years', 31557600),   # 365.25 days
+    ('month', 'months', 2630016),  # 30.44 days
+    ('day', 'days', 24 * 3600),
+    ('hr', 'hrs', 3600),
+    ('min', 'mins', 60),
+)
 
 def format_duration_from_seconds(seconds):
     """Format seconds into human-readable duration"""
     duration_parts = []
-    remaining_seconds = seconds
-    
-    # Years (approximate: 365.25 days)
-    years = remaining_seconds // (365.25 * 24 * 3600)
-    if years >= 1:
-        duration_parts.append(f"{int(years)} {'year' if years == 1 else 'years'}")
-        remaining_seconds %= (365.25 * 24 * 3600)
-    
-    # Months (approximate: 30.44 days)
-    months = remaining_seconds // (30.44 * 24 * 3600)
-    if months >= 1:
-        duration_parts.append(f"{int(months)} {'month' if months == 1 else 'months'}")
-        remaining_seconds %= (30.44 * 24 * 3600)
+    remaining_seconds = max(int(seconds), 0)
     
-    # Days
-    days = remaining_seconds // (24 * 3600)
-    if days >= 1:
-        duration_parts.append(f"{int(days)} {'day' if days == 1 else 'days'}")
-        remaining_seconds %= (24 * 3600)
-    
-    # Hours
-    hours = remaining_seconds // 3600
-    if hours >= 1:
-        duration_parts.append(f"{int(hours)} {'hr' if hours == 1 else 'hrs'}")
-        remaining_seconds %= 3600
-    
-    # Minutes
-    minutes = remaining_seconds // 60
-    if minutes >= 1:
-        duration_parts.append(f"{int(minutes)} {'min' if minutes == 1 else 'mins'}")
+    for singular, plural, unit_seconds in DURATION_FORMAT_UNITS:
+        count, remaining_seconds = divmod(remaining_seconds, unit_seconds)
+        if count:
+            duration_parts.append(f"{count} {singular if count == 1 else plural}")
     
     return ' '.join(duration_parts) if duration_parts else "less than 1 min"
 
-def extract_ad_times(start_text):
-    """Extract and parse ad timing information"""
+def extract_ad_times(start_text, now_timestamp=None):
+    """Extract and parse ad timing information (now_timestamp: current Unix time, if known)"""
     ad_data = {}
     
     try:
@@ -83,27 +72,19 @@ def extract_ad_times(start_text):
             }
         
         # Extract start date
-        start_date_match = re.search(r'Started running on\s+(\d{1,2}\s+\w+\s+\d{4})', start_text)
+        start_date_match = START_DATE_PATTERN.search(start_text)
         if start_date_match:
             start_date_str = start_date_match.group(1)
             ad_data['start_date'] = start_date_str
             
             # Convert to timestamp
-            try:
-                start_date_obj = datetime.strptime(start_date_str, '%d %B %Y')
-                ad_data['start_date_timestamp'] = int(start_date_obj.timestamp())
-            except ValueError:
-                try:
-                    start_date_obj = datetime.strptime(start_date_str, '%d %b %Y')
-                    ad_data['start_date_timestamp'] = int(start_date_obj.timestamp())
-                except ValueError:
-                    ad_data['start_date_timestamp'] = ""
+            ad_data['start_date_timestamp'] = parse_start_date_timestamp(start_date_str)
         else:
             ad_data['start_date'] = ""
             ad_data['start_date_timestamp'] = ""
         
         # Extract activity duration
-        duration_match = re.search(r'Total active time\s+(.+?)(?:\s*$|·)', start_text)
+        duration_match = ACTIVE_TIME_PATTERN.search(start_text)
         if duration_match:
             duration_str = duration_match.group(1).strip()
             ad_data['activity_duration'] = duration_str
@@ -117,7 +98,7 @@ def extract_ad_times(start_text):
             # Calculate duration if we have start date
             if ad_data.get('start_date_timestamp'):
                 try:
-                    current_timestamp = int(datetime.now().timestamp())
+                    current_timestamp = now_timestamp or int(datetime.now().timestamp())
                     calculated_duration = current_timestamp - ad_data['start_date_timestamp']
                     
                     formatted_duration = format_duration_from_seconds(calculated_duration)
@@ -2,23 +2,41 @@
 """File handling utilities"""
 
 import os
+import re
+import gzip
 import json
 import csv
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
 from typing import List, Dict, Any
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Matches JSON outputs written by save_scraped_data, capturing the sanitized keyword
+OUTPUT_JSON_PATTERN = re.compile(r"facebook_ads_(.+)_\d{8}_\d{6}\.json")
+
+def is_keyword_line(line):
+    """Check whether a stripped line holds a keyword (not blank, not a # comment)"""
+    return bool(line) and not line.startswith('#')
+
 def load_keywords_from_file(filename):
     """Load keywords from a text file"""
-    if not os.path.exists(filename):
-        print(f"Keywords file {filename} not found")
-        return []
+    from config import Config
     
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            keywords = [line.strip() for line in f.readlines() 
-                       if line.strip() and not line.strip().startswith('#')]
+        # Stream the lines (no copy of the whole file), strip each once, and drop
+        # repeats while keeping order
+        with open(filename, 'r', encoding='utf-8', buffering=Config.READ_BUFFER_SIZE) as f:
+            keywords = list(dict.fromkeys(filter(is_keyword_line, map(str.strip, f))))
         print(f"Loaded {len(keywords)} keywords from {filename}")
         return keywords
+    except FileNotFoundError:
+        print(f"Keywords file {filename} not found")
+        return []
     except Exception as e:
         print(f"Error loading keywords from {filename}: {e}")
         return []
@@ -30,72 +48,135 @@ def get_user_input_for_keyword():
     print(f"Default keywords file: {Config.DEFAULT_KEYWORDS_FILE}")
     user_input = input("Enter keyword to search(or press Enter for default): ").strip()
     
-    if not os.path.isfile(user_input):
-        return [user_input] if user_input else []
+    keywords_file = user_input or Config.DEFAULT_KEYWORDS_FILE
+    if os.path.isfile(keywords_file):
+        return load_keywords_from_file(keywords_file)
     
-    keywords_file = user_input if user_input else Config.DEFAULT_KEYWORDS_FILE
-    return load_keywords_from_file(keywords_file) if os.path.exists(keywords_file) else []
+    return [user_input] if user_input else []
+
+class FilenameCharTable(dict):
+    """str.translate table that drops characters unsafe in filenames, filled on first use"""
+    
+    def __missing__(self, codepoint):
+        char = chr(codepoint)
+        self[codepoint] = codepoint if char.isalnum() or char in ' -_' else None
+        return self[codepoint]
+
+FILENAME_CHAR_TABLE = FilenameCharTable()
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+# CSV columns: the fields FacebookAdScraper.scrape_single_ad produces, in sorted order
+CSV_FIELDNAMES = (
+    'activity_duration', 'activity_duration_timestamp', 'ad_description', 'category_name',
+    'cta', 'keyword', 'library_id', 'media_links', 'page_image_link', 'page_link',
+    'page_name', 'scraped_at', 'start_at', 'start_date', 'start_date_timestamp',
+)
+
+def sanitize_keyword(keyword):
+    """Make a keyword safe to use inside a filename"""
+    return keyword.translate(FILENAME_CHAR_TABLE).rstrip().replace(' ', '_')
 
 def create_safe_filename(keyword):
     """Create a safe filename from keyword"""
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    safe_keyword = "".join(c for c in keyword if c.isalnum() or c in (' ', '-', '_')).rstrip()
-    safe_keyword = safe_keyword.replace(' ', '_')
-    return f"facebook_ads_{safe_keyword}_{timestamp}"
+    timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+    return f"facebook_ads_{sanitize_keyword(keyword)}_{timestamp}"
 
-def save_scraped_data(html_content, data, keyword):
-    """Save scraped data to JSON, CSV, and HTML files"""
+def get_scraped_keywords():
+    """Get the sanitized keywords that already have JSON output, from one directory scan"""
     from config import Config
     
     try:
-        # Create output directory
-        if not os.path.exists(Config.OUTPUT_DIR):
-            os.makedirs(Config.OUTPUT_DIR)
-        
+        with os.scandir(Config.OUTPUT_DIR) as entries:
+            matches = (OUTPUT_JSON_PATTERN.fullmatch(entry.name) for entry in entries)
+            return {match.group(1) for match in matches if match}
+    except FileNotFoundError:
+        return set()
+
+def write_gzipped_text(filepath, text):
+    """Gzip text to a file, encoding it chunk by chunk instead of as one big bytes copy"""
+    from config import Config
+    
+    chunk_size = Config.WRITE_BUFFER_SIZE
+    with open(filepath, 'wb', buffering=chunk_size) as raw, \
+            gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=Config.HTML_COMPRESSION_LEVEL, mtime=0) as f:
+        for start in range(0, len(text), chunk_size):
+            f.write(text[start:start + chunk_size].encode('utf-8'))
+
+def dump_json_bytes(data, indent=True):
+    """Serialize data to UTF-8 JSON (indented, or compact) in a single buffer"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def ensure_output_dir():
+    """Create the output directory once, before any results are saved"""
+    from config import Config
+    
+    Path(Config.OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
+
+def save_scraped_data(html_content, data, keyword, save_html=None):
+    """Save scraped data to JSON, CSV, and (unless disabled) HTML files; returns success"""
+    from config import Config
+    
+    if save_html is None:
+        save_html = Config.SAVE_RAW_HTML
+    
+    try:
         base_filename = create_safe_filename(keyword)
         base_filepath = os.path.join(Config.OUTPUT_DIR, base_filename)
         
-        # Save HTML
-        html_filepath = f"{base_filepath}.html"
-        with open(html_filepath, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        print(f"✓ HTML file saved to: {html_filepath}")
-        
-        # Save JSON
-        json_filepath = f"{base_filepath}.json"
-        with open(json_filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        print(f"✓ JSON data saved to: {json_filepath}")
+        # The HTML is compressed on its own thread (zlib releases the GIL) while the
+        # JSON and CSV are written; leaving the block waits for it
+        with ThreadPoolExecutor(max_workers=1) as html_writer:
+            # Save HTML
+            if save_html:
+                html_filepath = f"{base_filepath}.html.gz"
+                html_future = html_writer.submit(write_gzipped_text, html_filepath, html_content)
+            
+            # Save JSON
+            json_filepath = f"{base_filepath}.json"
+            payload = dump_json_bytes(data)
+            with open(json_filepath, 'wb', buffering=0) as f:
+                f.write(payload)
+            print(f"✓ JSON data saved to: {json_filepath}")
+            
+            # Save CSV
+            if data:
+                csv_filepath = f"{base_filepath}.csv"
+                save_as_csv(data, csv_filepath)
+                print(f"✓ CSV data saved to: {csv_filepath}")
+                print(f"✓ Total records saved: {len(data)}")
+            
+            if save_html:
+                html_future.result()
+                print(f"✓ HTML file saved to: {html_filepath}")
         
-        # Save CSV
-        if data:
-            csv_filepath = f"{base_filepath}.csv"
-            save_as_csv(data, csv_filepath)
-            print(f"✓ CSV data saved to: {csv_filepath}")
-            print(f"✓ Total records saved: {len(data)}")
+        return True
             
     except Exception as e:
         print(f"Error saving scraped data: {e}")
+        return False
+
+def csv_value(value):
+    """Convert a record value to a CSV cell (dicts as JSON, lists joined with '; ')"""
+    if isinstance(value, dict):
+        return json.dumps(value)
+    if isinstance(value, list):
+        return '; '.join(map(str, value))
+    return value
 
 def save_as_csv(data, filepath):
     """Save data as CSV file"""
-    # Get all unique keys
-    all_keys = set()
-    for record in data:
-        all_keys.update(record.keys())
-    
-    fieldnames = sorted(list(all_keys))
+    from config import Config
     
-    with open(filepath, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
+    # Fixed schema, so rows stream out in a single pass over the records
+    with open(filepath, 'w', newline='', encoding='utf-8', buffering=Config.WRITE_BUFFER_SIZE) as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES, extrasaction='ignore')
         writer.writeheader()
         
-        for record in data:
-            # Convert complex types to strings for CSV
-            csv_record = {}
-            for key, value in record.items():
-                if isinstance(value, (list, dict)):
-                    csv_record[key] = json.dumps(value) if isinstance(value, dict) else '; '.join(str(v) for v in value)
-                else:
-                    csv_record[key] = value
-            writer.writerow(csv_record)
+        # Complex types are converted to strings as the rows are handed to the writer
+        writer.writerows(
+            {key: csv_value(value) for key, value in record.items()} for record in data
+        )